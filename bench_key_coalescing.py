@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Replay recorded key streams through Tool.main and count the redraws.
+
+Every stream is replayed twice against a fake screen: once with all of its
+keys pending at once, as under key repeat, and once with one key at a time.
+Both replays must end on the same selection, and the batched replay should
+need a single redraw of the selection.
+
+Run as: python bench_key_coalescing.py
+"""
+
+
+import configparser
+import curses
+import tempfile
+import time
+
+import competitive_programming_client as cpc
+
+
+_ITEMS = 5000
+_MAX_Y = 40
+_MAX_X = 80
+
+_STREAMS = {
+    "j repeat": "j"*500,
+    "k repeat": "G" + "k"*500,
+    "counts": "5j"*100 + "12k"*20,
+    "page down": [curses.KEY_NPAGE]*200,
+    "page up w/ count": ["G", "3"] + [curses.KEY_PPAGE]*50,
+    "gg": "j"*300 + "gg" + "j"*20,
+    "clamped": "k"*50 + "j"*10 + "G" + "j"*30,
+}
+
+
+class _FakeScreen:
+    """Enough of a curses window to run Tool.main, counting redraws."""
+    def __init__(self, batches):
+        self._batches = [list(batch) for batch in batches]
+        self._nodelay = False
+        self.redraws = 0
+
+    def getmaxyx(self):
+        return _MAX_Y, _MAX_X
+
+    def clear(self):
+        pass
+
+    def refresh(self):
+        pass
+
+    def addstr(self, y, x, string, attributes=0):  # pylint: disable=unused-argument,invalid-name
+        if y == 0:
+            self.redraws += 1  # The first line is drawn once per redraw of the selection
+
+    def nodelay(self, flag):
+        self._nodelay = flag
+
+    def timeout(self, delay):
+        self._nodelay = delay == 0
+
+    def getch(self):
+        if self._batches and not self._batches[0]:
+            if self._nodelay:
+                return -1  # The end of a batch, no more keys are pending
+            self._batches.pop(0)
+        return self._batches[0].pop(0)
+
+
+def _to_keys(stream):
+    return [key if isinstance(key, int) else ord(key) for key in stream]
+
+
+def _replay(keys, batched):
+    """Replay the keys, then quit, and return the final status and redraw count."""
+    config = configparser.ConfigParser()
+    config.read_dict({"cpc": {"path": tempfile.gettempdir(), "language": "python"}})
+    tool = cpc.Tool(config)
+
+    batches = [keys] if batched else [[key] for key in keys]
+    screen = _FakeScreen(batches + [_to_keys(":q\n")])
+    selection = cpc.ProblemContainer(
+        cpc.ProblemContainer(name=str(i)) for i in range(_ITEMS)
+    )
+    tool._screen = screen  # pylint: disable=protected-access
+    tool._ui = cpc.CursesUI(screen)  # pylint: disable=protected-access
+    tool._current_selection = selection  # pylint: disable=protected-access
+    tool._ui.set_selection(selection)  # pylint: disable=protected-access
+    screen.redraws = 0
+
+    start = time.perf_counter()
+    tool.main()
+    elapsed = time.perf_counter() - start
+    return tool._ui.status, screen.redraws, elapsed  # pylint: disable=protected-access
+
+
+def main():
+    curses.curs_set = lambda visibility: None  # There is no real terminal
+
+    print("{:<18} {:>5} {:>14} {:>14} {:>9}".format(
+        "stream", "keys", "redraws", "ms", "status ok",
+    ))
+    for name, stream in _STREAMS.items():
+        keys = _to_keys(stream)
+        batched_status, batched_redraws, batched_time = _replay(keys, batched=True)
+        single_status, single_redraws, single_time = _replay(keys, batched=False)
+        print("{:<18} {:>5} {:>6} vs {:>5} {:>6.2f} vs {:>5.2f} {:>9}".format(
+            name,
+            len(keys),
+            batched_redraws,
+            single_redraws,
+            1000*batched_time,
+            1000*single_time,
+            str(batched_status == single_status),
+        ))
+        assert batched_status == single_status, name
+        assert batched_redraws == 1, name
+
+
+if __name__ == "__main__":
+    main()
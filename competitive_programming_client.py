@@ -3,19 +3,38 @@
 
 import abc
 import argparse
+import bisect
 #import asyncio  # TODO: Do things asynchronously and rigorously
 import collections
+import concurrent.futures
 import configparser
+import contextlib
+import ctypes
+import ctypes.util
 import curses
+import functools
+import gzip
 import hashlib
+import html.parser
 import json
 import logging
 import math
+import os
 import pathlib
+import queue
+import random
+import re
+import select
+import shutil
+import signal
+import struct
 import subprocess
 import sys
 import tempfile
+import textwrap
+import threading
 import time
+import urllib.parse
 import urllib.request
 
 import selenium.webdriver
@@ -32,14 +51,80 @@ class ResponseError(Exception):
     pass
 
 
-def _hexdigest(string):
-    return hashlib.sha256(string.encode("utf-8")).hexdigest()
+class CompileError(Exception):
+    pass
+
+
+class JobFailed(Exception):
+    pass
+
+
+def _hexdigest(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _summarize_errors(text):
+    """Return the line of compiler output most worth showing.
+
+    That is the first line mentioning an error, else the last non-empty line.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    for line in lines:
+        if "error" in line.lower():
+            return line
+    return lines[-1] if lines else ""
+
+
+def _summarize_runtime_errors(text):
+    """Return the line of a program's error output most worth showing.
+
+    That is the last line naming an exception, e.g. "ValueError: ...", else the
+    last non-empty line. The first line mentioning an error may well be a line
+    of source code echoed in a traceback.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    for line in reversed(lines):
+        if re.match(r"[\w.$]*(Error|Exception)\b", line):
+            return line
+    return lines[-1] if lines else ""
+
+
+class _ProcessGroup(subprocess.Popen):
+    """A child process in a session of its own, killed along with its children.
+
+    Compilers hand the work to children of their own, which would otherwise
+    outlive a kill and keep the output pipe open.
+    """
+    def __init__(self, args, **kwargs):
+        super().__init__(args, start_new_session=True, **kwargs)
+
+    def kill(self):
+        try:
+            os.killpg(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def _write_atomically(path, data):
+    """Write bytes to a file such that readers never see it half written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=str(path.parent), delete=False) as temporary_file:
+        temporary_file.write(data)
+    os.replace(temporary_file.name, str(path))
 
 
 EDIT = ":edit"
 TEST = ":test"
 COMPILE = ":compile"
 SUBMIT = ":submit"
+REFRESH = ":refresh"
+WATCH = ":watch"
+JOBS = ":jobs"
+BROWSE = ":browse"
+STANDINGS = ":standings"
+CANCEL = ":cancel"
 
 
 #
@@ -62,39 +147,84 @@ class ProgrammingLanguage(metaclass=abc.ABCMeta):
         pass
 
     @abc.abstractmethod
-    def compile(self, source_file_path):
-        """Compile file and return the compiled file's path."""
+    def compile(self, source_file_path, attach_process=None):
+        """Compile file and return the compiled file's path.
+
+        If given, attach_process is called with the compiler's process once it
+        has started and with None once it has finished.
+        """
         _LOGGER.debug("Compiling %s", source_file_path)
 
     @abc.abstractmethod
-    def run(
+    def start(
             self,
             program_file_path,
             input_stream,
             output_stream,
+            error_stream,
         ):
-        """Run a compiled program with input and output streams."""
+        """Start a compiled program with input, output and error streams and return its process."""
         pass
 
+    def run(
+            self,
+            program_file_path,
+            input_stream=sys.stdin,
+            output_stream=sys.stdout,
+            error_stream=sys.stderr,
+        ):
+        """Run a compiled program with input, output and error streams."""
+        return self.start(
+            program_file_path,
+            input_stream,
+            output_stream,
+            error_stream,
+        ).wait()
+
+    def _call_compiler(self, args, attach_process=None):  # pylint: disable=no-self-use
+        """Run a compiler, keeping its output off the terminal, and check it succeeded."""
+        process = _ProcessGroup(
+            args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        )
+        if attach_process is not None:
+            attach_process(process)
+        try:
+            output, _ = process.communicate()
+        finally:
+            if attach_process is not None:
+                attach_process(None)
+        _LOGGER.debug("Return code of compilation is %s", process.returncode)
+        if process.returncode != 0:
+            _LOGGER.debug("Compiler output:\n%s", output)
+            raise CompileError(
+                _summarize_errors(output)
+                or "Compilation failed w/ return code {}".format(process.returncode)
+            )
+
 
 class Python(ProgrammingLanguage):
     """The Python programming language."""
     name = "python"
     extension = ".py"
 
-    def compile(self, source_file_path):
+    def compile(self, source_file_path, attach_process=None):
         return source_file_path
 
-    def run(
+    def start(
             self,
             program_file_path,
-            input_stream=sys.stdin,
-            output_stream=sys.stdout,
+            input_stream,
+            output_stream,
+            error_stream,
         ):
-        return subprocess.call(
+        return subprocess.Popen(
             ["python", program_file_path],
             stdin=input_stream,
             stdout=output_stream,
+            stderr=error_stream,
         )
 
 
@@ -103,24 +233,28 @@ class CPP(ProgrammingLanguage):
     name = "c++"
     extension = ".cpp"
 
-    def compile(self, source_file_path):
-        super().compile(source_file_path)
+    def compile(self, source_file_path, attach_process=None):
+        super().compile(source_file_path, attach_process)
         out_file_path = source_file_path.with_suffix(".out")
         _LOGGER.debug("The output file is %s", out_file_path)
-        return_code = subprocess.call(["g++", source_file_path, "-o", out_file_path])
-        _LOGGER.debug("Return code of compilation is %s", return_code)
+        self._call_compiler(
+            ["g++", source_file_path, "-o", out_file_path],
+            attach_process,
+        )
         return out_file_path
 
-    def run(
+    def start(
             self,
             program_file_path,
-            input_stream=sys.stdin,
-            output_stream=sys.stdout,
+            input_stream,
+            output_stream,
+            error_stream,
         ):
-        return subprocess.call(
+        return subprocess.Popen(
             [program_file_path],
             stdin=input_stream,
             stdout=output_stream,
+            stderr=error_stream,
         )
 
 
@@ -129,29 +263,444 @@ class Java(ProgrammingLanguage):
     name = "java"
     extension = ".java"
 
-    def compile(self, source_file_path):
-        super().compile(source_file_path)
+    def compile(self, source_file_path, attach_process=None):
+        super().compile(source_file_path, attach_process)
         directory = source_file_path.parent
         _LOGGER.debug("Directory is %s", directory)
-        return_code = subprocess.call(["javac", source_file_path, "-d", directory])
-        _LOGGER.debug("Return code of compilation is %s", return_code)
+        self._call_compiler(
+            ["javac", source_file_path, "-d", directory],
+            attach_process,
+        )
         out_file_path = source_file_path.with_suffix(".class")
         _LOGGER.debug("The output file should be %s", out_file_path)
         return out_file_path
 
-    def run(
+    def start(
             self,
             program_file_path,
-            input_stream=sys.stdin,
-            output_stream=sys.stdout,
+            input_stream,
+            output_stream,
+            error_stream,
         ):
-        return subprocess.call(
+        return subprocess.Popen(
             ["java", program_file_path],
             stdin=input_stream,
             stdout=output_stream,
+            stderr=error_stream,
         )
 
 
+#
+# Test storing classes
+#
+
+
+class StoredTest:
+    """A test of a problem, the files of which are kept in a TestStore."""
+    def __init__(
+            self,
+            store,
+            name,
+            input_key,
+            output_key,
+        ):
+        self._store = store
+        self.name = name
+        self.input_key = input_key
+        self.output_key = output_key
+
+    def __str__(self):
+        return self.name
+
+    def open_input(self):
+        """Return a context manager of the input as a binary file."""
+        return self._store.open(self.input_key)
+
+    def read_output(self):
+        """Return the expected output."""
+        return self._store.read(self.output_key).decode("utf-8")
+
+
+class TestStore:
+    """A content-addressed store of test files, shared by all problems.
+
+    Files are kept under their sha256 digest, so a file used by many tests is
+    only stored once, and files of at least compress_threshold bytes are
+    gzipped. The tests of a problem are listed in an index in its directory.
+    """
+    INDEX_NAME = "tests.json"
+
+    def __init__(self, path, *, compress_threshold=1 << 20):
+        self._path = path
+        self._compress_threshold = compress_threshold
+
+    def add_test(self, problem_path, name, input_data, output_data):
+        """Store a test in the index of the problem directory, replacing any namesake."""
+        entry = {
+            "name": name,
+            "input": self._put(input_data),
+            "output": self._put(output_data),
+        }
+        index = [
+            other_entry
+            for other_entry in self._read_index(problem_path)
+            if other_entry["name"] != name
+        ]
+        index.append(entry)
+        _write_atomically(
+            problem_path/self.INDEX_NAME,
+            json.dumps(index, indent=1).encode("utf-8"),
+        )
+
+    def get_tests(self, problem_path):
+        """Return the tests in the index of the problem directory."""
+        return [
+            StoredTest(self, entry["name"], entry["input"], entry["output"])
+            for entry in self._read_index(problem_path)
+        ]
+
+    @contextlib.contextmanager
+    def open(self, key):
+        """Open a stored file for reading, e.g. as the stdin of a program.
+
+        Uncompressed files are opened directly, so a program reads them
+        straight from the file descriptor without passing through Python.
+        """
+        path = self._get_path(key)
+        if path.exists():
+            with path.open("rb") as stored_file:
+                yield stored_file
+        else:
+            with gzip.open(str(path.with_suffix(".gz"))) as compressed_file, \
+                    tempfile.TemporaryFile() as stored_file:
+                shutil.copyfileobj(compressed_file, stored_file)
+                stored_file.seek(0)
+                yield stored_file
+
+    def read(self, key):
+        """Return the contents of a stored file."""
+        path = self._get_path(key)
+        if path.exists():
+            return path.read_bytes()
+        return gzip.decompress(path.with_suffix(".gz").read_bytes())
+
+    def _put(self, data):
+        """Store the data, unless already stored, and return its key."""
+        key = _hexdigest(data)
+        path = self._get_path(key)
+        if not (path.exists() or path.with_suffix(".gz").exists()):
+            if len(data) >= self._compress_threshold:
+                _write_atomically(path.with_suffix(".gz"), gzip.compress(data))
+            else:
+                _write_atomically(path, data)
+        return key
+
+    def _get_path(self, key):
+        return self._path/key[:2]/key[2:]
+
+    def _read_index(self, problem_path):
+        try:
+            with (problem_path/self.INDEX_NAME).open() as index_file:
+                return json.load(index_file)
+        except FileNotFoundError:
+            return []
+
+
+#
+# File watching class
+#
+
+
+class FileWatcher:
+    """Call a function in the background whenever a file has been saved.
+
+    Uses inotify where available and falls back to polling the file's stat.
+    """
+
+    _IN_CLOSE_WRITE = 0x008
+    _IN_MOVED_TO = 0x080
+    _IN_CREATE = 0x100
+    _EVENT = struct.Struct("iIII")  # wd, mask, cookie and len of an inotify event
+
+    def __init__(
+            self,
+            path,
+            callback,
+            *,
+            debounce=0.2,
+            interval=0.5,
+        ):
+        self._path = path
+        self._callback = callback
+        self._debounce = debounce  # How long the file must be left alone after a save
+        self._interval = interval  # How often to poll and check for being stopped
+        self._stopped = threading.Event()
+        self._signature = self._get_signature()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+
+    def start(self):
+        """Start watching the file."""
+        _LOGGER.debug("Watching %s", self._path)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching the file."""
+        _LOGGER.debug("No longer watching %s", self._path)
+        self._stopped.set()
+
+    def _watch(self):
+        inotify_fd = self._open_inotify()
+        try:
+            while not self._stopped.is_set():
+                if self._wait_for_change(inotify_fd, self._interval):
+                    # Editors may write a file in several steps, wait for quiet
+                    while self._wait_for_change(inotify_fd, self._debounce):
+                        pass
+                    if not self._stopped.is_set():
+                        self._callback()
+        finally:
+            if inotify_fd is not None:
+                os.close(inotify_fd)
+
+    def _open_inotify(self):
+        """Return an inotify file descriptor watching the file, if possible."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            inotify_fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if inotify_fd < 0:
+            return None
+        # Watch the directory, as editors often save by replacing the file
+        mask = self._IN_CLOSE_WRITE | self._IN_MOVED_TO | self._IN_CREATE
+        if libc.inotify_add_watch(inotify_fd, os.fsencode(self._path.parent), mask) < 0:
+            os.close(inotify_fd)
+            return None
+        return inotify_fd
+
+    def _wait_for_change(self, inotify_fd, timeout):
+        """Wait at most timeout seconds and return whether the file changed."""
+        if inotify_fd is None:
+            if self._stopped.wait(timeout):
+                return False
+            signature = self._get_signature()
+            changed = signature != self._signature
+            self._signature = signature
+            return changed
+
+        readable, _, _ = select.select([inotify_fd], [], [], timeout)
+        if not readable:
+            return False
+        changed = False
+        name = os.fsencode(self._path.name)
+        while True:
+            try:
+                data = os.read(inotify_fd, 4096)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = self._EVENT.unpack_from(data, offset)
+                offset += self._EVENT.size
+                changed |= data[offset:offset + length].rstrip(b"\0") == name
+                offset += length
+
+    def _get_signature(self):
+        try:
+            stat = self._path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+#
+# Job scheduling classes
+#
+
+
+class Job:
+    """A unit of background work, e.g. compiling or testing a solution."""
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(
+            self,
+            name,
+            priority,
+            function,
+            *,
+            depends_on=(),
+        ):
+        self.name = name
+        self.priority = priority  # Lower priorities are run first
+        self.function = function  # Called with the job, may set its message
+        self.depends_on = tuple(depends_on)  # Jobs that must be done first
+        self.state = self.PENDING
+        self.result = None
+        self.message = ""  # A short description of the outcome
+        self._cancelled = threading.Event()
+        self._process = None  # The child process the job is waiting on, if any
+        self._process_lock = threading.Lock()
+
+    def __str__(self):
+        if self.message:
+            return "{0.state:9} {0.name} ({0.message})".format(self)
+        return "{0.state:9} {0.name}".format(self)
+
+    @property
+    def cancelled(self):
+        """Return whether the job has been asked to stop."""
+        return self._cancelled.is_set()
+
+    @property
+    def finished(self):
+        return self.state in (self.DONE, self.FAILED, self.CANCELLED)
+
+    def cancel(self):
+        """Ask the job to stop, killing the child process it is waiting on, if any.
+
+        Otherwise running jobs stop at their next check.
+        """
+        with self._process_lock:
+            self._cancelled.set()
+            if self._process is not None:
+                self._process.kill()
+
+    def attach_process(self, process):
+        """Set the child process the job waits on, so cancelling kills it.
+
+        Set to None once the process has finished.
+        """
+        with self._process_lock:
+            self._process = process
+            if process is not None and self.cancelled:
+                process.kill()
+
+
+class JobScheduler:
+    """Run jobs in priority order on a pool of worker threads."""
+    COMPILE = 0
+    TEST = 1
+    SUBMIT = 2
+
+    def __init__(self, workers=1, *, callback=None):
+        self._callback = callback  # Called with every job that finishes
+        self._condition = threading.Condition()
+        self._pending = []  # Sorted (priority, sequence number, job) tuples
+        self._sequence = 0
+        self._jobs = collections.deque(maxlen=100)  # The most recent jobs
+        self._shut_down = False
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    @property
+    def jobs(self):
+        """Return the most recent jobs, newest first."""
+        with self._condition:
+            return list(reversed(self._jobs))
+
+    @property
+    def busy(self):
+        """Return whether any job has yet to finish."""
+        with self._condition:
+            return any(not job.finished for job in self._jobs)
+
+    def submit(self, name, priority, function, *, depends_on=()):
+        """Queue a new job and return it."""
+        job = Job(name, priority, function, depends_on=depends_on)
+        _LOGGER.debug("Submitting job %s", job)
+        with self._condition:
+            bisect.insort(self._pending, (priority, self._sequence, job))
+            self._sequence += 1
+            self._jobs.append(job)
+            self._condition.notify_all()
+        return job
+
+    def cancel(self, job):
+        """Cancel a job, along with the pending jobs depending on it."""
+        with self._condition:
+            job.cancel()
+            for i, (_, _, pending_job) in enumerate(self._pending):
+                if pending_job is job:
+                    del self._pending[i]
+                    job.state = Job.CANCELLED
+                    self._finished(job)
+                    break
+            self._condition.notify_all()
+
+    def shutdown(self):
+        """Cancel every job and stop the workers."""
+        with self._condition:
+            self._shut_down = True
+            for job in self._jobs:
+                job.cancel()
+            self._condition.notify_all()
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._take_job()
+                while job is None and not self._shut_down:
+                    self._condition.wait()
+                    job = self._take_job()
+                if job is None:
+                    return
+                job.state = Job.RUNNING
+
+            _LOGGER.debug("Running job %s", job)
+            try:
+                job.result = job.function(job)
+            except Exception as error:  # pylint: disable=broad-except
+                _LOGGER.debug("Job %s failed", job, exc_info=True)
+                job.message = str(error) or type(error).__name__
+                state = Job.FAILED
+            else:
+                state = Job.CANCELLED if job.cancelled else Job.DONE
+            if job.cancelled:
+                state = Job.CANCELLED
+                job.message = ""  # Any progress or failure message is moot now
+
+            # Reported under the lock, so no one sees the job finished before it is reported
+            with self._condition:
+                job.state = state
+                self._finished(job)
+                self._condition.notify_all()
+
+    def _take_job(self):
+        """Remove and return the first runnable pending job, if any.
+
+        Pending jobs that can no longer run are finished as cancelled.
+        """
+        for i, (_, _, job) in enumerate(self._pending):
+            dependencies_failed = any(
+                dependency.state in (Job.FAILED, Job.CANCELLED)
+                for dependency in job.depends_on
+            )
+            if job.cancelled or dependencies_failed:
+                del self._pending[i]
+                job.state = Job.CANCELLED
+                if dependencies_failed and not job.message:
+                    job.message = "a job it depends on did not succeed"
+                self._condition.notify_all()
+                self._finished(job)
+                return self._take_job()
+            if all(dependency.state == Job.DONE for dependency in job.depends_on):
+                del self._pending[i]
+                return job
+        return None
+
+    def _finished(self, job):
+        """Report a finished job, always called w/ the condition held."""
+        _LOGGER.debug("Job %s finished", job)
+        if self._callback is not None:
+            self._callback(job)
+
+
 #
 # UI class
 #
@@ -229,6 +778,8 @@ class CursesUI:
             if isinstance(status, self.Status):
                 self._index = status.index
                 self._viewport_start = status.viewport_start
+                # The selection may have changed since, e.g. by a refresh
+                self._keep_selected_visible()
             else:
                 raise TypeError
         self._refresh_viewport()
@@ -243,7 +794,7 @@ class CursesUI:
         else:
             raise TypeError
 
-    def move_selection(self, n=1):  # pylint: disable=invalid-name
+    def move_selection(self, n=1, *, refresh=True):  # pylint: disable=invalid-name
         """Change the selected item of the selection by moving up or down."""
         # Calculate new index without going above or below the selection
         new_index = self._index + n
@@ -255,23 +806,32 @@ class CursesUI:
         # TODO: Either do a total or selective update of the selection
         #       Also move viewport, like, smartly-like
 
-        max_y = self._screen.getmaxyx()[0]
-        if new_index < self._viewport_start:
-            # Moved up beyond viewport
-            self._viewport_start = new_index
-        elif new_index >= self._viewport_start + max_y - 1:
-            # Moved down beyond viewport
-            # viewport_start + max_y is the status bar
-            self._viewport_start = new_index - max_y + 2
-
         self._index = new_index
-        self._refresh_viewport()
+        self._keep_selected_visible()
+        if refresh:
+            self._refresh_viewport()
 
-    def move_viewport(self, n=1):  # pylint: disable=invalid-name
+    def move_viewport(self, n=1, *, refresh=True):  # pylint: disable=invalid-name
         """Change which part of the selection is visible by moving up or down."""
         self._viewport_start += n
+        if refresh:
+            self._refresh_viewport()
+
+    def refresh_selection(self):
+        """Redraw the selection, e.g. after moving without refreshing."""
         self._refresh_viewport()
 
+    def _keep_selected_visible(self):
+        """Move the viewport just enough for the selected item to be in it."""
+        max_y = self._screen.getmaxyx()[0]
+        if self._index < self._viewport_start:
+            # Selected item is above viewport
+            self._viewport_start = self._index
+        elif self._index >= self._viewport_start + max_y - 1:
+            # Selected item is below viewport
+            # viewport_start + max_y is the status bar
+            self._viewport_start = self._index - max_y + 2
+
     def _prepare_string(self, string, padding=" "):
         """Truncate and pad a string so it is exactly the screens width."""
         _, max_x = self._screen.getmaxyx()
@@ -286,7 +846,16 @@ class CursesUI:
                 line = self._prepare_string(self._selection[index])
             else:
                 line = " "*(max_x - 1)
-            color = curses.A_REVERSE if index == self._index else curses.A_NORMAL
+            if index == self._index:
+                color = curses.A_REVERSE
+            elif 0 <= index < len(self._selection) and getattr(
+                    self._selection[index],
+                    "highlighted",
+                    False,
+                ):
+                color = curses.A_BOLD
+            else:
+                color = curses.A_NORMAL
             self._screen.addstr(y, 0, line, color)
             index += 1
 
@@ -311,6 +880,20 @@ class ProblemContainer(list):
     def __str__(self):
         return "{}".format(self.name)
 
+    def insert(self, index, item):
+        """Insert item before index, keeping the same item selected.
+
+        The UI keeps the selected item visible when the status is restored.
+        """
+        super().insert(index, item)
+        if self.status is not None:
+            if index <= self.status.index:
+                self.status = self.status._replace(index=self.status.index + 1)
+                if index <= self.status.viewport_start:
+                    self.status = self.status._replace(
+                        viewport_start=self.status.viewport_start + 1,
+                    )
+
 
 class Problem:
     """The wrapper class for problem dictionaries."""
@@ -332,6 +915,211 @@ class Problem:
         return pathlib.Path(str(self.obj["contestId"]))/self.obj["index"]
 
 
+class StatementLine:
+    """A line of a problem statement as shown in the terminal."""
+    def __init__(
+            self,
+            text,
+            problem,
+            *,
+            highlighted=False,
+        ):
+        self.text = text
+        self.problem = problem  # The problem the statement belongs to
+        self.highlighted = highlighted  # Whether the line is part of a sample
+
+    def __str__(self):
+        return self.text
+
+
+class StandingsRow:
+    """A compact row of contest standings."""
+    __slots__ = ("party", "rank", "points", "penalty", "results")
+
+    def __init__(
+            self,
+            party,
+            rank,
+            points,
+            penalty,
+            results,
+        ):
+        self.party = party  # The handle(s) or team name of the participant
+        self.rank = rank
+        self.points = points
+        self.penalty = penalty
+        self.results = results  # A short string per problem, see format_result
+
+    def __str__(self):
+        return "{0.rank:>6} {0.party:<24.24} {0.points:>7g} {0.penalty:>6} {1}".format(
+            self,
+            " ".join("{:>3}".format(result) for result in self.results),
+        )
+
+    @staticmethod
+    def format_result(points, rejected):
+        """Return e.g. "+", "+2", "-1" or "." for a problem result."""
+        if points > 0:
+            return "+{}".format(rejected or "")
+        if rejected > 0:
+            return "-{}".format(rejected)
+        return "."
+
+    def update(self, row):
+        """Take the values of the row of the same party and return whether any changed."""
+        changed = (
+            (self.rank, self.points, self.penalty, self.results)
+            != (row.rank, row.points, row.penalty, row.results)
+        )
+        if changed:
+            self.rank = row.rank
+            self.points = row.points
+            self.penalty = row.penalty
+            self.results = row.results
+        return changed
+
+
+class Standings(ProblemContainer):
+    """The standings of a contest, loaded a page at a time and updated in place."""
+    def __init__(
+            self,
+            contest_id,
+            *,
+            handles=None,
+            page_size=100,
+        ):
+        super().__init__(name="Standings of {}".format(contest_id))
+        self.contest_id = contest_id
+        self.handles = handles  # The handles to show, or None for everyone
+        self.page_size = page_size
+        self.complete = False  # Whether the last page has been loaded
+        self._rows = {}  # The rows by party
+
+    def update(self, rows):
+        """Merge freshly fetched rows into the standings and return how many changed."""
+        changed = 0
+        reorder = False
+        for row in rows:
+            known_row = self._rows.get(row.party)
+            if known_row is None:
+                self._rows[row.party] = row
+                self.append(row)
+                changed += 1
+                reorder |= len(self) > 1 and self[-2].rank > row.rank
+            else:
+                rank = known_row.rank
+                if known_row.update(row):
+                    changed += 1
+                    reorder |= rank != row.rank
+        if reorder:
+            self.sort(key=lambda row: row.rank)
+        return changed
+
+
+class _SampleParser(html.parser.HTMLParser):
+    """Collect the sample tests of a Codeforces problem page."""
+    def __init__(self):
+        super().__init__()
+        self.inputs = []
+        self.outputs = []
+        self._kind = None  # Either "input" or "output" while inside a sample
+        self._chunks = None  # The text pieces of the current <pre>, if any
+
+    @property
+    def samples(self):
+        """Return the list of (input, output) pairs found so far."""
+        return list(zip(self.inputs, self.outputs))
+
+    def handle_starttag(self, tag, attrs):
+        classes = (dict(attrs).get("class") or "").split()
+        if tag == "div" and self._chunks is None:
+            if "input" in classes:
+                self._kind = "input"
+            elif "output" in classes:
+                self._kind = "output"
+        elif tag == "pre" and self._kind is not None:
+            self._chunks = []
+        elif tag == "br" and self._chunks is not None:
+            self._chunks.append("\n")
+
+    def handle_endtag(self, tag):
+        if self._chunks is None:
+            return
+        if tag == "pre":
+            lines = "".join(self._chunks).strip("\n").splitlines()
+            text = "".join(line.rstrip() + "\n" for line in lines)
+            (self.inputs if self._kind == "input" else self.outputs).append(text)
+            self._kind = None
+            self._chunks = None
+        elif tag == "div":
+            # Newer pages wrap each line of a sample in its own <div>
+            self._chunks.append("\n")
+
+    def handle_data(self, data):
+        if self._chunks is not None:
+            self._chunks.append(data)
+
+
+class _StatementParser(html.parser.HTMLParser):
+    """Collect the paragraphs of the statement of a Codeforces problem page."""
+    _BLOCK_TAGS = {"div", "p", "li", "ul", "ol", "pre", "center", "tr", "h1", "h2", "h3"}
+
+    def __init__(self):
+        super().__init__()
+        self.paragraphs = []  # Pairs of text and whether it's a sample
+        self._classes = []  # The classes of the <div> tags within the statement
+        self._chunks = []  # The text pieces of the current paragraph
+        self._in_pre = False
+
+    def handle_starttag(self, tag, attrs):
+        classes = (dict(attrs).get("class") or "").split()
+        if not self._classes:
+            if tag == "div" and "problem-statement" in classes:
+                self._classes.append(classes)
+            return
+        if tag == "div":
+            self._classes.append(classes)
+        if tag == "br" and self._in_pre:
+            self._chunks.append("\n")
+        elif tag in self._BLOCK_TAGS and not self._in_pre:
+            self._flush()
+        if tag == "pre":
+            self._in_pre = True
+
+    def handle_endtag(self, tag):
+        if not self._classes:
+            return
+        if tag == "pre":
+            self._flush()
+            self._in_pre = False
+        elif tag == "div" and self._in_pre:
+            # Newer pages wrap each line of a sample in its own <div>
+            self._chunks.append("\n")
+        elif tag == "div" and "property-title" in self._classes[-1]:
+            self._chunks.append(": ")
+        elif tag in self._BLOCK_TAGS:
+            self._flush()
+        if tag == "div":
+            self._classes.pop()
+
+    def handle_data(self, data):
+        if self._classes:
+            self._chunks.append(data)
+
+    def _flush(self):
+        """End the current paragraph."""
+        text = "".join(self._chunks)
+        self._chunks = []
+        if self._in_pre:
+            lines = text.strip("\n").splitlines()
+            if lines:
+                self.paragraphs.append(("\n".join(line.rstrip() for line in lines), True))
+        else:
+            text = " ".join(text.replace("$$$", "").split())
+            if text:
+                self.paragraphs.append((text, False))
+
+
 class CPClient(metaclass=abc.ABCMeta):
     @property
     @abc.abstractmethod
@@ -344,11 +1132,39 @@ class CPClient(metaclass=abc.ABCMeta):
         """Return the catalogue of problems."""
         _LOGGER.debug("Getting catalogue of %s", self.name)
 
+    @abc.abstractmethod
+    def update_catalogue(self, catalogue):
+        """Bring the catalogue up to date in place and return the number of changes."""
+        _LOGGER.debug("Updating catalogue of %s", self.name)
+
     @abc.abstractmethod
     def get_tests(self, problem):
         """Return some form of problem tests"""
         _LOGGER.debug("Getting tests from %s", self.name)
 
+    @abc.abstractmethod
+    def prefetch(self, problems):
+        """Start fetching problems in the background so loading them is instant."""
+        _LOGGER.debug("Prefetching %s problems from %s", len(problems), self.name)
+
+    @abc.abstractmethod
+    def get_statement(self, problem):
+        """Return the problem statement as (text, is_sample) paragraphs."""
+        _LOGGER.debug("Getting %s statement: %s", self.name, problem)
+
+    @abc.abstractmethod
+    def get_standings(self, contest_id, start, count, *, handles=None):
+        """Return count StandingsRows of a contest from the start-th row on.
+
+        If handles are given, only the rows of those handles are included.
+        """
+        _LOGGER.debug("Getting %s standings of contest %s", self.name, contest_id)
+
+    @abc.abstractmethod
+    def get_friends(self):
+        """Return the handles of the user and their friends."""
+        _LOGGER.debug("Getting friends from %s", self.name)
+
     @abc.abstractmethod
     def load_problem(self, problem):
         """Load problem, whatever that entails.
@@ -366,7 +1182,13 @@ class CPClient(metaclass=abc.ABCMeta):
 class CodeforcesClient(CPClient):
     name = "Codeforces"
 
+    _API_INTERVAL = 2  # Seconds between API calls, as per the API's rate limit
+
     def __init__(self, config):
+        path = pathlib.Path(config["cpc"]["path"]).expanduser()
+        self._path = path/self.name
+        self._tests = TestStore(path/".tests")
+
         config = config[self.name]
 
         self._username = config["username"]
@@ -395,10 +1217,21 @@ class CodeforcesClient(CPClient):
 
         _LOGGER.debug("%s api_url = %s", self, self._api_url)
 
+        self._api_lock = threading.Lock()
+        self._api_called = -math.inf  # When the API was last called
+
         self._client = None
+        self._client_lock = threading.RLock()  # Chrome is used by one thread at a time
         self._logged_in = False
 
+        self._prefetch_workers = config.getint("prefetch_workers", fallback=4)
+        self._executor = None
+        self._prefetching = {}  # Problem paths mapped to futures of their fetches
+        self._prefetching_lock = threading.Lock()
+
     def __del__(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
         if self._client is not None:
             # Close chrome
             _LOGGER.debug("%s closing chrome", self)
@@ -429,81 +1262,274 @@ class CodeforcesClient(CPClient):
 
     def get_catalogue(self):
         super().get_catalogue()
-        _LOGGER.debug("Getting problems via %s", self._api_url)
-        response = urllib.request.urlopen(self._api_url + "problemset.problems")
+        contests = self._get_problemset()
+        catalogue = ProblemContainer(
+            (
+                self._make_contest(contest_id, problems)
+                for contest_id, problems in contests.items()
+            ),
+            name=self.name,
+        )
+        catalogue.sort(key=lambda contest: contest.name)
+        return catalogue
+
+    def update_catalogue(self, catalogue):
+        super().update_catalogue(catalogue)
+        contests = self._get_problemset()
+
+        # Only new problems are made into objects, known ones are patched in place
+        known_contests = {contest.name: contest for contest in catalogue}
+        contest_ids = [contest.name for contest in catalogue]
+        changes = 0
+
+        for contest_id, problems in contests.items():
+            contest = known_contests.get(contest_id)
+            if contest is None:
+                position = bisect.bisect(contest_ids, contest_id)
+                contest_ids.insert(position, contest_id)
+                catalogue.insert(position, self._make_contest(contest_id, problems))
+                changes += len(problems)
+                continue
+
+            known_problems = {problem.obj["index"]: problem for problem in contest}
+            for index, obj in problems.items():
+                problem = known_problems.get(index)
+                if problem is None:
+                    indices = [other.obj["index"] for other in contest]
+                    contest.insert(bisect.bisect(indices, index), self._make_problem(obj))
+                    changes += 1
+                elif problem.obj != obj:
+                    problem.obj.update(obj)
+                    changes += 1
+
+        _LOGGER.debug("Catalogue of %s updated w/ %s changes", self.name, changes)
+        return changes
+
+    def _get_problemset(self):
+        """Return the problems of the problemset by contest and index."""
+        result = self._call_api("problemset.problems")
+        contests = collections.defaultdict(dict)
+
+        problems = result["problems"]
+        statistics = result["problemStatistics"]
+
+        assert len(problems) == len(statistics)
+
+        for problem in problems:
+            contest_id = problem["contestId"]
+            index = problem["index"]
+            contests[contest_id][index] = problem
+
+        for statistic in statistics:
+            contest_id = statistic["contestId"]
+            index = statistic["index"]
+            contests[contest_id][index]["solvedCount"] = statistic["solvedCount"]
+
+        return contests
+
+    def _call_api(self, method, *, sign=False, **params):
+        """Call a method of the API and return its result.
+
+        Calls are spaced out to stay within the rate limit of the API.
+        """
+        if sign:
+            params["apiKey"] = self._key
+            params["time"] = int(time.time())
+        query = sorted((key, str(value)) for key, value in params.items())
+        if sign:
+            rand = "{:06d}".format(random.randrange(10**6))
+            signed = "{}/{}?{}#{}".format(
+                rand,
+                method,
+                "&".join("{}={}".format(key, value) for key, value in query),
+                self._secret,
+            )
+            query.append(("apiSig", rand + hashlib.sha512(signed.encode("utf-8")).hexdigest()))
+        url = self._api_url + method
+        if query:
+            url += "?" + urllib.parse.urlencode(query)
+
+        with self._api_lock:
+            delay = self._api_called + self._API_INTERVAL - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            _LOGGER.debug("Calling API method %s", method)
+            try:
+                response = urllib.request.urlopen(url)
+            finally:
+                self._api_called = time.monotonic()
+
         if response.status == 200:
             response_dict = json.load(response)
             if response_dict["status"] == "OK":
-                contests = collections.defaultdict(dict)
-
-                problems = response_dict["result"]["problems"]
-                statistics = response_dict["result"]["problemStatistics"]
-
-                assert len(problems) == len(statistics)
-
-                for problem in problems:
-                    contest_id = problem["contestId"]
-                    index = problem["index"]
-                    contests[contest_id][index] = problem
-
-                for statistic in statistics:
-                    contest_id = statistic["contestId"]
-                    index = statistic["index"]
-                    contests[contest_id][index]["solvedCount"] = statistic["solvedCount"]
-
-                catalogue = ProblemContainer(
-                    (
-                        ProblemContainer(
-                            (
-                                Problem(
-                                    problem,
-                                    "{0[contestId]}/{0[index]}: {0[name]} (solved={0[solvedCount]})",
-                                )
-                                for problem in problems.values()),
-                            name=contest_id,
+                return response_dict["result"]
+        raise ResponseError
+
+    def _make_contest(self, contest_id, problems):
+        contest = ProblemContainer(
+            (self._make_problem(problem) for problem in problems.values()),
+            name=contest_id,
+        )
+        contest.sort(key=lambda problem: problem.obj["index"])
+        return contest
+
+    def _make_problem(self, problem):
+        return Problem(
+            problem,
+            "{0[contestId]}/{0[index]}: {0[name]} (solved={0[solvedCount]})",
+        )
+
+    def get_statement(self, problem):
+        super().get_statement(problem)
+        statement_path = self._get_statement_path(problem)
+        if not statement_path.exists():
+            self._fetch(problem).result()
+        parser = _StatementParser()
+        parser.feed(statement_path.read_text(encoding="utf-8"))
+        parser.close()
+        return parser.paragraphs
+
+    def get_standings(self, contest_id, start, count, *, handles=None):
+        super().get_standings(contest_id, start, count, handles=handles)
+        params = {"contestId": contest_id, "from": start, "count": count}
+        if handles is not None:
+            params["handles"] = ";".join(handles)
+        result = self._call_api("contest.standings", **params)
+        rows = []
+        for row in result["rows"]:
+            party = row["party"]
+            rows.append(
+                StandingsRow(
+                    party.get("teamName") or ",".join(
+                        member["handle"] for member in party["members"]
+                    ),
+                    row["rank"],
+                    row["points"],
+                    row["penalty"],
+                    tuple(
+                        StandingsRow.format_result(
+                            problem_result["points"],
+                            problem_result.get("rejectedAttemptCount", 0),
                         )
-                        for contest_id, problems in contests.items()
+                        for problem_result in row["problemResults"]
                     ),
-                    name=self.name,
-                )
+                ),
+            )
+        return rows
 
-                catalogue.sort(key=lambda contest: contest.name)
-                #for contest in catalogue:
-                #    contest.sort(key=lambda problem: problem.obj["index"])
-
-                return catalogue
-        raise ResponseError
+    def get_friends(self):
+        super().get_friends()
+        return [self._username] + self._call_api("user.friends", sign=True)
 
     def load_problem(self, problem):
         super().load_problem(problem)
-        url = "{}problemset/problem/{}/{}".format(
+        self._wait_for_prefetch(problem)
+        statement_path = self._get_statement_path(problem)
+        if statement_path.exists():
+            self._show(statement_path.resolve().as_uri())
+        else:
+            self._show(self._get_problem_url(problem))
+
+    def submit_solution(self, problem, solution_path):
+        super().submit_solution(problem, solution_path)
+        with self._client_lock:
+            self._log_in()
+            if solution_path.exists():
+                # The submit form only works on the live page, not the local copy
+                self._show(self._get_problem_url(problem))
+                file_input = self.client.find_element_by_css_selector("input[name=sourceFile]")
+                file_input.send_keys(str(solution_path))  # TODO: str necessary?
+                submit_button = self.client.find_element_by_css_selector("input.submit")
+                self.client.execute_script("arguments[0].click();", submit_button)
+
+    def get_tests(self, problem):
+        super().get_tests(problem)
+        if not self._get_statement_path(problem).exists():
+            self._fetch(problem).result()
+        return self._tests.get_tests(self._path/problem.path)
+
+    def prefetch(self, problems):
+        super().prefetch(problems)
+        for problem in problems:
+            if not self._get_statement_path(problem).exists():
+                self._fetch(problem)
+
+    def _fetch(self, problem):
+        """Return the future of fetching the problem, joining any fetch under way.
+
+        A new fetch is only started if there is none or the last one failed.
+        """
+        with self._prefetching_lock:
+            future = self._prefetching.get(problem.path)
+            if future is None or (future.done() and future.exception() is not None):
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self._prefetch_workers,
+                    )
+                future = self._executor.submit(self._fetch_problem, problem)
+                self._prefetching[problem.path] = future
+            return future
+
+    def _get_problem_url(self, problem):
+        return "{}problemset/problem/{}/{}".format(
             self._url,
             problem.obj["contestId"],
             problem.obj["index"],
         )
+
+    def _get_statement_path(self, problem):
+        return self._path/problem.path/"statement.html"
+
+    def _show(self, url):
+        """Display the problem statement found at url in chrome."""
         _LOGGER.debug("Getting %s", url)
-        if self.client.current_url != url:
-            self.client.get(url)
-            self.client.execute_script(
-                "return arguments[0].scrollIntoView();",
-                self.client.find_element_by_class_name("problem-statement"),
+        with self._client_lock:
+            if self.client.current_url != url:
+                self.client.get(url)
+                self.client.execute_script(
+                    "return arguments[0].scrollIntoView();",
+                    self.client.find_element_by_class_name("problem-statement"),
+                )
+                self.client.execute_script("window.scrollBy(-window.screenX, 0)")
+
+    def _fetch_problem(self, problem):
+        """Store the problem page and its sample tests locally."""
+        url = self._get_problem_url(problem)
+        _LOGGER.debug("Fetching %s", url)
+        response = urllib.request.urlopen(url)
+        if response.status != 200:
+            raise ResponseError
+        page = response.read().decode("utf-8")
+
+        parser = _SampleParser()
+        parser.feed(page)
+        parser.close()
+
+        problem_path = self._path/problem.path
+        problem_path.mkdir(parents=True, exist_ok=True)
+        for i, (sample_input, sample_output) in enumerate(parser.samples, 1):
+            self._tests.add_test(
+                problem_path,
+                "sample{}".format(i),
+                sample_input.encode("utf-8"),
+                sample_output.encode("utf-8"),
             )
-            self.client.execute_script("window.scrollBy(-window.screenX, 0)")
 
-    def submit_solution(self, problem, solution_path):
-        super().submit_solution(problem, solution_path)
-        self._log_in()
-        if solution_path.exists():
-            self.load_problem(problem)
-            file_input = self.client.find_element_by_css_selector("input[name=sourceFile]")
-            file_input.send_keys(str(solution_path))  # TODO: str necessary?
-            submit_button = self.client.find_element_by_css_selector("input.submit")
-            self.client.execute_script("arguments[0].click();", submit_button)
-
-    def get_tests(self, problem):
-        # TODO: Can easily be done without selenium
-        self._load_problem(problem)
-        raise NotImplementedError
+        # Have the links of the local copy resolve against the server
+        page = page.replace("<head>", '<head><base href="{}">'.format(self._url), 1)
+        # The statement is written last, its existence marks a complete fetch
+        _write_atomically(self._get_statement_path(problem), page.encode("utf-8"))
+        _LOGGER.debug("Fetched %s with %s samples", problem, len(parser.samples))
+
+    def _wait_for_prefetch(self, problem):
+        """Block until the prefetch of the problem, if any, is done."""
+        with self._prefetching_lock:
+            future = self._prefetching.get(problem.path)
+        if future is not None:
+            try:
+                future.result()
+            except (OSError, ResponseError):
+                _LOGGER.exception("Prefetching %s failed", problem)
 
 
 #
@@ -522,7 +1548,7 @@ class Tool:
         language_preferred = config["cpc"]["language"]
         for programming_language in ProgrammingLanguage.__subclasses__():
             if programming_language.name.startswith(language_preferred):
-                self._language = programming_language
+                self._language = programming_language()
                 break
         else:
             raise RuntimeError("Lacking support for preferred language")
@@ -531,6 +1557,27 @@ class Tool:
 
         self._screen = None
         self._ui = None
+        self._messages = queue.Queue()  # Status bar messages from the background
+
+        self._time_limit = config["cpc"].getfloat("time_limit", fallback=5)  # Per test
+
+        self._scheduler = JobScheduler(
+            config["cpc"].getint("workers", fallback=2),
+            callback=self._on_job_finished,
+        )
+
+        self._watcher = None
+        self._watch_jobs = ()  # The jobs started by the latest save
+        # Compiles of the same solution would write the same output file
+        self._compile_locks = {}  # Solution paths mapped to locks
+        self._compile_locks_lock = threading.Lock()
+
+        self._standings_interval = config["cpc"].getint("standings_interval", fallback=30)
+        # Standings are fetched on a thread of their own, as they are no user job
+        self._standings_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self._standings_fetch = None  # The future of the viewed standings' rows
+        self._standings_updated = -math.inf  # When the viewed standings were refetched
+        self._standings_failed = -math.inf  # When fetching the viewed standings last failed
 
         self._stack = []
         self._current_selection = ProblemContainer(
@@ -547,6 +1594,9 @@ class Tool:
         self._ui = CursesUI(screen)
         self._ui.set_selection(self._current_selection)
         self.main()
+        self._unwatch()
+        self._scheduler.shutdown()
+        self._standings_executor.shutdown(wait=False)
         screen.clear()
 
     def main(self):
@@ -559,102 +1609,152 @@ class Tool:
         while True:
             _LOGGER.debug("Main loop iterating w/ history = %s", history)
 
-            c = self._screen.getch()  # pylint: disable=invalid-name
-            status_bar = chr(c)  # Default status bar string
-            add_to_history = True
+            # Handle every pending key before drawing, so that under key repeat
+            # a run of motions only costs a single redraw of the selection
+            shown_status_bar = None
 
-            _LOGGER.debug(
-                "Got character c = %s; i.e., chr(c) = %s",
-                c,
-                repr(status_bar),  # status_bar starts off as chr(c)
-            )
-
-            if command:
-                if c == ord("\n"):
-                    command = command.split()
-                    if "q" in command[0] and set(command[0]).issubset(":wqa!"):
-                        break  # TODO: This has to be done smarter
-                    status = self._ui.status
-                    selected = self._current_selection[status.index]
-                    status_bar = self._handle_command(command, selected)
-                    command = ""
-                elif c == curses.KEY_BACKSPACE:
-                    command = command[:len(command) - 1]
-                    status_bar = command
-                else:
-                    command += chr(c)
-                    status_bar = command
-
-                self._ui.set_status_bar(status_bar)
-                continue
-
-            # Handle numbers, they modify count
-            if c in range(ord("0"), ord("9") + 1):
-                count = 10*count + (c - ord("0"))
-                _LOGGER.debug("This causes the count to become %s", count)
-                continue
-
-            # The resizing is a bit of a special case
-            if c == curses.KEY_RESIZE:
-                self._ui.refresh()
-                continue  # Don't care to add to history or destroy count
-            # Move down some
-            elif c in (ord("j"), curses.KEY_DOWN):
-                self._ui.move_selection(1 if count == 0 else count)
-            # Move up some
-            elif c in (ord("k"), curses.KEY_UP):
-                self._ui.move_selection(-1 if count == 0 else -count)
-            # Move down heaps
-            elif c == curses.KEY_NPAGE:
-                self._ui.move_selection(10 if count == 0 else 10*count)
-            # Move up heaps
-            elif c == curses.KEY_PPAGE:
-                self._ui.move_selection(-10 if count == 0 else -10*count)
-            # Move to top
-            elif c == curses.KEY_HOME:
-                self._ui.move_selection(-math.inf)
-            # Move to top
-            elif c == ord("g") and history and history[0] == ord("g"):
-                self._ui.move_selection(-math.inf)
-                history.clear()
-                add_to_history = False
-                status_bar = "gg"
-            # Move to bottom
-            elif c == curses.KEY_END or c == ord("G"):
-                self._ui.move_selection(math.inf)
-            # Move list down
-            elif c == ord("\x05"):  # Ctrl+e
-                self._ui.move_viewport(1 if count == 0 else count)
-            # Move list up
-            elif c == ord("\x19"):  # Ctrl+y
-                self._ui.move_viewport(-1 if count == 0 else -count)
-            # User starts a command
-            elif c == ord(":"):
-                command = status_bar  # ":"
-                history.clear()  # History prior to the command has no effect
-                add_to_history = False
-            # Go down level or edit
-            elif c in (ord("l"), curses.KEY_RIGHT, ord("\n")):
-                self._go_down_level()
-            # Go up level
-            elif c in (ord("h"), curses.KEY_LEFT, curses.KEY_BACKSPACE):
-                self._go_up_level()
-            # No special handling
-            else:
-                pass
+            keys = self._get_keys()
+            for c in keys:  # pylint: disable=invalid-name
+                status_bar = chr(c)  # Default status bar string
+                add_to_history = True
 
-            # Beyond this point we do three things:
-            #   - Set count back to zero
-            #   - Set the status bar of the UI
-            #   - Add to the history (unless told otherwise)
+                _LOGGER.debug(
+                    "Got character c = %s; i.e., chr(c) = %s",
+                    c,
+                    repr(status_bar),  # status_bar starts off as chr(c)
+                )
 
-            count = 0
+                if command:
+                    if c == ord("\n"):
+                        command = command.split()
+                        if "q" in command[0] and set(command[0]).issubset(":wqa!"):
+                            return  # TODO: This has to be done smarter
+                        status = self._ui.status
+                        selected = self._current_selection[status.index]
+                        status_bar = self._handle_command(command, selected)
+                        command = ""
+                    elif c == curses.KEY_BACKSPACE:
+                        command = command[:len(command) - 1]
+                        status_bar = command
+                    else:
+                        command += chr(c)
+                        status_bar = command
+
+                    shown_status_bar = status_bar
+                    continue
+
+                # Handle numbers, they modify count
+                if c in range(ord("0"), ord("9") + 1):
+                    count = 10*count + (c - ord("0"))
+                    _LOGGER.debug("This causes the count to become %s", count)
+                    continue
+
+                # The resizing is a bit of a special case
+                if c == curses.KEY_RESIZE:
+                    self._ui.refresh()
+                    continue  # Don't care to add to history or destroy count
+                # Move down some
+                elif c in (ord("j"), curses.KEY_DOWN):
+                    self._ui.move_selection(1 if count == 0 else count, refresh=False)
+                # Move up some
+                elif c in (ord("k"), curses.KEY_UP):
+                    self._ui.move_selection(-1 if count == 0 else -count, refresh=False)
+                # Move down heaps
+                elif c == curses.KEY_NPAGE:
+                    self._ui.move_selection(10 if count == 0 else 10*count, refresh=False)
+                # Move up heaps
+                elif c == curses.KEY_PPAGE:
+                    self._ui.move_selection(-10 if count == 0 else -10*count, refresh=False)
+                # Move to top
+                elif c == curses.KEY_HOME:
+                    self._ui.move_selection(-math.inf, refresh=False)
+                # Move to top
+                elif c == ord("g") and history and history[0] == ord("g"):
+                    self._ui.move_selection(-math.inf, refresh=False)
+                    history.clear()
+                    add_to_history = False
+                    status_bar = "gg"
+                # Move to bottom
+                elif c == curses.KEY_END or c == ord("G"):
+                    self._ui.move_selection(math.inf, refresh=False)
+                # Move list down
+                elif c == ord("\x05"):  # Ctrl+e
+                    self._ui.move_viewport(1 if count == 0 else count, refresh=False)
+                # Move list up
+                elif c == ord("\x19"):  # Ctrl+y
+                    self._ui.move_viewport(-1 if count == 0 else -count, refresh=False)
+                # User starts a command
+                elif c == ord(":"):
+                    command = status_bar  # ":"
+                    history.clear()  # History prior to the command has no effect
+                    add_to_history = False
+                # Go down level or edit
+                elif c in (ord("l"), curses.KEY_RIGHT, ord("\n")):
+                    self._go_down_level()
+                # Go up level
+                elif c in (ord("h"), curses.KEY_LEFT, curses.KEY_BACKSPACE):
+                    self._go_up_level()
+                # No special handling
+                else:
+                    pass
+
+                # Beyond this point we do three things:
+                #   - Set count back to zero
+                #   - Set the status bar of the UI (once the keys are handled)
+                #   - Add to the history (unless told otherwise)
+
+                count = 0
+                shown_status_bar = status_bar
+                if add_to_history:
+                    history.appendleft(c)
+
+            messages = self._get_messages()
+            if messages:
+                shown_status_bar = messages[-1]
+            standings_changed = self._update_standings()
+            if keys or messages or standings_changed:
+                self._ui.refresh_selection()
+            if shown_status_bar is not None:
+                try:
+                    self._ui.set_status_bar(shown_status_bar)
+                except curses.error:
+                    self._ui.set_status_bar("")
+
+    def _get_keys(self):
+        """Wait for a key and return it along with any keys pending after it.
+
+        Returns an empty list if no key came before it was time to check on
+        the work going on in the background.
+        """
+        background = (
+            self._watcher is not None
+            or self._scheduler.busy
+            or isinstance(self._current_selection, Standings)
+        )
+        self._screen.timeout(100 if background else -1)
+        keys = [self._screen.getch()]
+        if keys[0] == -1:
+            return []
+        self._screen.nodelay(True)
+        try:
+            while True:
+                c = self._screen.getch()  # pylint: disable=invalid-name
+                if c == -1:
+                    break
+                keys.append(c)
+        finally:
+            self._screen.nodelay(False)
+        _LOGGER.debug("Got %s keys", len(keys))
+        return keys
+
+    def _get_messages(self):
+        """Return the status bar messages sent from the background, oldest first."""
+        messages = []
+        while True:
             try:
-                self._ui.set_status_bar(status_bar)
-            except curses.error:
-                self._ui.set_status_bar("")
-            if add_to_history:
-                history.appendleft(c)
+                messages.append(self._messages.get_nowait())
+            except queue.Empty:
+                return messages
 
     def _get_paths(self, problem):
         """Return problem path and solution path."""
@@ -672,11 +1772,42 @@ class Tool:
 
         _LOGGER.debug("Handling command sequence %s", command)
 
+        if isinstance(selected, StatementLine):
+            selected = selected.problem  # Commands in a statement are about its problem
+
         status_bar = ""
         non_command = False
 
-        # All commands are in the context of a problem right now TODO
-        if not isinstance(selected, Problem):
+        # The refresh command, which is not in the context of a problem
+        if command[0] != ":" and REFRESH.startswith(command[0]):
+            if len(command) == 1:
+                status_bar = self._refresh()
+                non_command = status_bar is None
+            else:
+                non_command = True
+        # The jobs command, which is not in the context of a problem either
+        elif command[0] != ":" and JOBS.startswith(command[0]):
+            if len(command) == 1:
+                status_bar = self._show_jobs()
+            else:
+                non_command = True
+        # The standings command, in the context of a contest or a problem
+        # (though ":s" remains short for submit)
+        elif (
+                STANDINGS.startswith(command[0])
+                and not SUBMIT.startswith(command[0])
+            ):
+            status_bar = self._standings(command, selected)
+            non_command = status_bar is None
+        # The cancel command, in the context of a job
+        elif isinstance(selected, Job):
+            if command[0] != ":" and CANCEL.startswith(command[0]) and len(command) == 1:
+                self._scheduler.cancel(selected)
+                status_bar = "Cancelled {}".format(selected.name)
+            else:
+                non_command = True
+        # All other commands are in the context of a problem right now TODO
+        elif not isinstance(selected, Problem):
             _LOGGER.debug("%s is not a Problem, so do nothing")
             non_command = True
         # The edit command
@@ -688,18 +1819,34 @@ class Tool:
         # The submit command
         elif SUBMIT.startswith(command[0]):
             if len(command) == 1:
-                self._submit(selected)
+                status_bar = self._submit(selected)
             else:
                 non_command = True
         # The compile command
         elif COMPILE.startswith(command[0]):
             if len(command) == 1:
-                self._compile(selected)
+                status_bar = self._compile(selected)
             else:
                 non_command = True
         # The test command
         elif TEST.startswith(command[0]):
-            non_command = not self._test(command, selected)
+            status_bar = self._test(command, selected)
+            non_command = status_bar is None
+        # The browse command
+        elif BROWSE.startswith(command[0]):
+            if len(command) == 1:
+                self._client.load_problem(selected)
+            else:
+                non_command = True
+        # The watch command
+        elif WATCH.startswith(command[0]):
+            if len(command) == 1:
+                status_bar = self._watch(selected)
+            elif len(command) == 2 and "off".startswith(command[1]):
+                self._unwatch()
+                status_bar = "Stopped watching"
+            else:
+                non_command = True
         # Catchall
         else:
             non_command = True
@@ -741,42 +1888,354 @@ class Tool:
                     self._ui.set_loading()
                     selected = self._client.get_catalogue()
                 self._current_selection[status.index] = selected
+            elif any(isinstance(item, Problem) for item in selected):
+                _LOGGER.debug("Container is a contest, prefetch its problems")
+                self._client.prefetch(selected)
             self._current_selection.status = status
             self._stack.append(self._current_selection)
             self._current_selection = selected
             self._ui.set_selection(selected, status=selected.status)
         elif isinstance(selected, Problem):
-            _LOGGER.debug("Load problem")
-            self._client.load_problem(selected)
+            _LOGGER.debug("Show problem statement")
+            self._show_statement(selected)
+        elif isinstance(selected, (Job, StatementLine, StandingsRow)):
+            _LOGGER.debug("Nothing to move into")
         else:
             _LOGGER.warning("Unexpected, do nothing")
 
+    def _show_statement(self, problem):
+        """Move into the statement of the problem, as text in the terminal."""
+        self._ui.set_loading()
+        try:
+            paragraphs = self._client.get_statement(problem)
+        except (OSError, ResponseError):
+            _LOGGER.exception("Getting the statement of %s failed", problem)
+            paragraphs = []
+        if not paragraphs:
+            _LOGGER.debug("No statement to show, load problem instead")
+            self._ui.set_selection(self._current_selection, status=self._ui.status)
+            self._client.load_problem(problem)
+            return
+
+        width = self._screen.getmaxyx()[1] - 1
+        lines = []
+        for text, sample in paragraphs:
+            if sample:
+                lines.extend(
+                    StatementLine(line, problem, highlighted=True)
+                    for line in text.splitlines()
+                )
+            else:
+                lines.extend(
+                    StatementLine(line, problem)
+                    for line in textwrap.wrap(text, width)
+                )
+            lines.append(StatementLine("", problem))
+
+        self._current_selection.status = self._ui.status
+        self._stack.append(self._current_selection)
+        self._current_selection = ProblemContainer(lines, name=str(problem))
+        self._ui.set_selection(self._current_selection)
+
+    def _standings(self, command, selected):
+        """Move into the standings of the selected contest, or problem's contest."""
+        if self._client is None:
+            return None
+        if isinstance(selected, Problem):
+            contest_id = selected.obj["contestId"]
+        elif isinstance(selected, ProblemContainer) and isinstance(selected.name, int):
+            contest_id = selected.name
+        else:
+            return None
+
+        self._ui.set_loading()
+        handles = command[1:] or None  # Replaced by the friends below, if asked for
+        standings = Standings(contest_id, handles=handles)
+        try:
+            if len(command) == 2 and "friends".startswith(command[1]):
+                standings.handles = self._client.get_friends()
+            rows = self._client.get_standings(
+                contest_id,
+                1,
+                standings.page_size,
+                handles=standings.handles,
+            )
+        except (OSError, ResponseError):
+            _LOGGER.exception("Getting the standings of %s failed", contest_id)
+            rows = []
+        standings.update(rows)
+        standings.complete = len(rows) < standings.page_size
+        if not standings:
+            self._ui.set_selection(self._current_selection, status=self._ui.status)
+            return "No standings"
+
+        self._current_selection.status = self._ui.status
+        self._stack.append(self._current_selection)
+        self._current_selection = standings
+        self._ui.set_selection(standings)
+        self._standings_fetch = None
+        self._standings_updated = time.monotonic()
+        self._standings_failed = -math.inf
+        return str(standings)
+
+    def _update_standings(self):
+        """Keep the standings being viewed, if any, up to date.
+
+        Fetches the next page when nearing the bottom and all loaded rows
+        every so often, in the background. Returns whether any row changed.
+        """
+        standings = self._current_selection
+        if not isinstance(standings, Standings):
+            return False
+
+        fetch = self._standings_fetch
+        if fetch is not None:
+            if not fetch.done():
+                return False
+            self._standings_fetch = None
+            try:
+                fetched_standings, rows, complete = fetch.result()
+            except (OSError, ResponseError):
+                # Back off, e.g. the contest may not have started yet
+                _LOGGER.debug("Fetching standings failed, backing off", exc_info=True)
+                self._standings_updated = time.monotonic()
+                self._standings_failed = time.monotonic()
+                return False
+            if fetched_standings is not standings:
+                return False
+            changed = standings.update(rows)
+            if complete is not None:
+                standings.complete = complete
+            else:
+                self._standings_updated = time.monotonic()
+            _LOGGER.debug("%s rows of the standings changed", changed)
+            return changed > 0
+
+        now = time.monotonic()
+        rows_below = len(standings) - self._ui.status.index
+        if (
+                not standings.complete
+                and rows_below < self._screen.getmaxyx()[0]
+                and now - self._standings_failed >= self._standings_interval
+            ):
+            # Fetch the next page
+            start = len(standings) + 1
+            count = standings.page_size
+        elif now - self._standings_updated >= self._standings_interval:
+            # Refetch the loaded pages in a single call
+            start = 1
+            count = len(standings)
+        else:
+            return False
+        self._standings_fetch = self._standings_executor.submit(
+            self._fetch_standings,
+            self._client,
+            standings,
+            start,
+            count,
+        )
+        return False
+
+    @staticmethod
+    def _fetch_standings(client, standings, start, count):
+        """Fetch rows of the standings, telling whether they are the last ones."""
+        rows = client.get_standings(
+            standings.contest_id,
+            start,
+            count,
+            handles=standings.handles,
+        )
+        if start == 1:
+            return standings, rows, None  # A refresh, which doesn't reach further
+        return standings, rows, len(rows) < count
+
+    def _refresh(self):
+        """Update the catalogue of the current server, if any, in place."""
+        if self._client is None:
+            return None
+        if len(self._stack) > 1:
+            catalogue = self._stack[1]
+        else:
+            catalogue = self._current_selection
+        self._current_selection.status = self._ui.status
+        self._ui.set_loading()
+        try:
+            changes = self._client.update_catalogue(catalogue)
+        except (OSError, ResponseError):
+            _LOGGER.debug("Failed refreshing catalogue", exc_info=True)
+            changes = None
+        self._ui.set_selection(
+            self._current_selection,
+            status=self._current_selection.status,
+        )
+        if changes is None:
+            return "Failed refreshing catalogue"
+        return "Refreshed catalogue w/ {} changes".format(changes)
+
     def _edit(self, problem):
         _, solution_path = self._get_paths(problem)
         subprocess.call(["vim", str(solution_path)])
         self._ui.refresh()  # To avoid residual effects
 
     def _submit(self, problem):
+        """Submit the solution once it compiles and passes the tests."""
         _, solution_path = self._get_paths(problem)
-        self._client.submit_solution(problem, solution_path)
+        _, test_job = self._schedule_tests(problem, self._client, solution_path)
+        self._scheduler.submit(
+            "submit {}".format(problem),
+            JobScheduler.SUBMIT,
+            functools.partial(self._submit_job, problem, self._client, solution_path),
+            depends_on=(test_job,),
+        )
+        return "Queued submission of {}".format(problem)
 
     def _test(self, command, problem):
+        """Handle the test command and return the status bar message, if any."""
         if len(command) == 1:
             _, solution_path = self._get_paths(problem)
-            compiled_file = self._language.compile(solution_path)
-            # TODO: Implement testing
+            self._schedule_tests(problem, self._client, solution_path)
+            return "Queued tests of {}".format(problem)
         elif len(command) == 2:
             if "new".startswith(command[1]):
                 pass  # Create new test files
             elif "load".startswith(command[1]):
-                pass  # Load tests from server
+                try:
+                    tests = self._client.get_tests(problem)
+                except (OSError, ResponseError):
+                    _LOGGER.exception("Loading the tests of %s failed", problem)
+                    return "Failed loading tests of {}".format(problem)
+                return "Loaded {} tests".format(len(tests))
             else:
                 pass
-        return False
+        return None
+
+    def _run_test(self, program_path, test, job):
+        """Run the program on a single test and return why it failed, if it did."""
+        with test.open_input() as input_file, \
+                tempfile.TemporaryFile("w+") as output_file, \
+                tempfile.TemporaryFile("w+") as error_file:
+            process = self._language.start(program_path, input_file, output_file, error_file)
+            job.attach_process(process)
+            try:
+                return_code = process.wait(timeout=self._time_limit)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                return "time limit exceeded"
+            finally:
+                job.attach_process(None)
+            _LOGGER.debug("Test %s gave return code %s", test, return_code)
+            if job.cancelled:
+                return "cancelled"
+            if return_code != 0:
+                error_file.seek(0)
+                error = _summarize_runtime_errors(error_file.read())
+                return "runtime error: {}".format(error) if error else "runtime error"
+            output_file.seek(0)
+            output = output_file.read()
+        if output.split() != test.read_output().split():
+            return "wrong answer"
+        return None
+
+    def _watch(self, problem):
+        """Retest the solution of the problem in the background on every save."""
+        self._unwatch()
+        _, solution_path = self._get_paths(problem)
+        self._watcher = FileWatcher(
+            solution_path,
+            functools.partial(self._on_save, problem, self._client, solution_path),
+        )
+        self._watcher.start()
+        return "Watching {}".format(problem)
+
+    def _unwatch(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+            for job in self._watch_jobs:
+                self._scheduler.cancel(job)
+
+    def _on_save(self, problem, client, solution_path):
+        """Start retesting the solution, superseding the jobs of the last save."""
+        for job in self._watch_jobs:
+            self._scheduler.cancel(job)
+        self._watch_jobs = self._schedule_tests(problem, client, solution_path)
 
     def _compile(self, problem):
         _, solution_path = self._get_paths(problem)
-        return self._language.compile(solution_path)
+        self._schedule_compile(problem, solution_path)
+        return "Queued compilation of {}".format(problem)
+
+    def _show_jobs(self):
+        """Move into a listing of the most recent jobs."""
+        jobs = self._scheduler.jobs
+        if not jobs:
+            return "No jobs"
+        self._current_selection.status = self._ui.status
+        self._stack.append(self._current_selection)
+        self._current_selection = ProblemContainer(jobs, name="Jobs")
+        self._ui.set_selection(self._current_selection)
+        return ""
+
+    #
+    # The jobs behind the commands, run in the background by the scheduler
+    #
+
+    def _schedule_compile(self, problem, solution_path):
+        return self._scheduler.submit(
+            "compile {}".format(problem),
+            JobScheduler.COMPILE,
+            functools.partial(self._compile_job, solution_path),
+        )
+
+    def _schedule_tests(self, problem, client, solution_path):
+        """Schedule compiling and testing the solution and return both jobs."""
+        compile_job = self._schedule_compile(problem, solution_path)
+        test_job = self._scheduler.submit(
+            "test {}".format(problem),
+            JobScheduler.TEST,
+            functools.partial(self._test_job, problem, client, compile_job),
+            depends_on=(compile_job,),
+        )
+        return compile_job, test_job
+
+    def _compile_job(self, solution_path, job):
+        with self._compile_locks_lock:
+            lock = self._compile_locks.setdefault(solution_path, threading.Lock())
+        with lock:
+            if job.cancelled:
+                return None
+            compiled_file = self._language.compile(solution_path, job.attach_process)
+        job.message = "compiled {}".format(compiled_file.name)
+        return compiled_file
+
+    def _test_job(self, problem, client, compile_job, job):
+        tests = client.get_tests(problem)
+        passed = 0
+        first_failure = None
+        for i, test in enumerate(tests):
+            if job.cancelled:
+                return
+            job.message = "running test {}/{}".format(i + 1, len(tests))
+            failure = self._run_test(compile_job.result, test, job)
+            if failure is None:
+                passed += 1
+            elif first_failure is None:
+                first_failure = "{}: {}".format(test, failure)
+        if job.cancelled:
+            return
+        job.message = "passed {}/{} tests".format(passed, len(tests))
+        if first_failure is not None:
+            job.message += ", " + first_failure
+            raise JobFailed(job.message)
+
+    def _submit_job(self, problem, client, solution_path, job):  # pylint: disable=no-self-use
+        client.submit_solution(problem, solution_path)
+        job.message = "submitted"
+
+    def _on_job_finished(self, job):
+        """Report a finished job on the status bar, called from the background."""
+        self._messages.put("{}: {}".format(job.name, job.message or job.state))
 
 
 def _main():